@@ -45,6 +45,7 @@ from .key_bindings import cli_bindings
 from .lexer import LiteCliLexer
 from .__init__ import __version__
 from .packages.filepaths import dir_path_exists
+from .packages.parseutils import is_destructive_statement, read_queries
 
 import itertools
 
@@ -203,18 +204,28 @@ class LiteCli(object):
     def execute_from_file(self, arg, **_):
         if not arg:
             message = "Missing required argument, filename."
-            return [(None, None, None, message)]
+            yield (None, None, None, message)
+            return
         try:
-            with open(os.path.expanduser(arg), encoding="utf-8") as f:
-                query = f.read()
+            f = open(os.path.expanduser(arg), encoding="utf-8")
         except IOError as e:
-            return [(None, None, None, str(e))]
-
-        if self.destructive_warning and confirm_destructive_query(query) is False:
-            message = "Wise choice. Command execution stopped."
-            return [(None, None, None, message)]
+            yield (None, None, None, str(e))
+            return
 
-        return self.sqlexecute.run(query)
+        with f:
+            # Statements run as they are read, so the user is asked about the
+            # first destructive one when it comes up, and only once.
+            confirmed = not self.destructive_warning
+            for statement in read_queries(f):
+                query = str(statement)
+                if not confirmed and is_destructive_statement(statement):
+                    destroy = confirm_destructive_query(query)
+                    if destroy is False:
+                        yield (None, None, None, "Wise choice. Command execution stopped.")
+                        return
+                    confirmed = destroy is True
+                for result in self.sqlexecute.run(query, split=False):
+                    yield result
 
     def change_prompt_format(self, arg, **_):
         """
@@ -517,6 +528,7 @@ class LiteCli(object):
                 if need_completion_refresh(text):
                     self.refresh_completions(reset=need_completion_reset(text))
             finally:
+                special.flush_tee()
                 if self.logfile is False:
                     self.echo("Warning: This query was not logged.", err=True, fg="red")
             query = Query(text, successful, mutating)
@@ -690,6 +702,10 @@ class LiteCli(object):
             self.log_output(status)
             click.secho(status)
 
+        # Flush per result set, so the files keep up during \watch too.
+        special.flush_tee()
+        special.flush_once()
+
     def configure_pager(self):
         # Provide sane defaults for less if they are empty.
         if not os.environ.get("LESS"):
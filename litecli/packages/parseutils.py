@@ -1,8 +1,9 @@
 from __future__ import print_function
 import re
 import sqlparse
+from sqlparse.engine import FilterStack
 from sqlparse.sql import IdentifierList, Identifier, Function
-from sqlparse.tokens import Keyword, DML, Punctuation
+from sqlparse.tokens import Keyword, DML, Punctuation, Error
 
 cleanup_regex = {
     # This matches only alphanumerics and underscores.
@@ -215,10 +216,73 @@ def queries_start_with(queries, prefixes):
     return False
 
 
+def read_queries(f, chunk_size=4 * 1024 * 1024):
+    """Read SQL from the file object *f* a chunk at a time.
+
+    Yields the statements one at a time, as sqlparse Statements that are
+    split but not grouped, so a large script can be run without holding all
+    of it in memory. str() of a statement is its text.
+    """
+    pending = ""
+    statements = []
+    safe = 0
+    while True:
+        data = f.read(chunk_size)
+        if not data:
+            break
+        text = pending + data
+        # Split without grouping, as sqlparse.split() does: grouping is by far
+        # the slowest part of sqlparse.parse() and isn't needed here.
+        statements = list(FilterStack().run(text))
+        # The last statement may continue in the next chunk, and so may
+        # everything from a string, identifier or comment that isn't closed
+        # yet, because sqlparse splits on the semicolons inside it.
+        safe = len(statements) - 1
+        for i, stmt in enumerate(statements[:safe]):
+            if is_unterminated(stmt):
+                safe = i
+                break
+        # str() of a parsed statement is its raw text, whitespace included,
+        # so whatever follows the safe ones is carried over as is.
+        consumed = 0
+        for stmt in statements[:safe]:
+            query = str(stmt)
+            consumed += len(query)
+            if query.strip():
+                yield stmt
+        pending = text[consumed:]
+    # At the end of the file whatever was carried over is all there is.
+    for stmt in statements[safe:]:
+        if str(stmt).strip():
+            yield stmt
+
+
+def is_unterminated(statement):
+    """Returns if *statement* opens a string, quoted identifier or comment it
+    doesn't close."""
+    prev = None
+    for token in statement.flatten():
+        if token.ttype is Error or (token.ttype is Punctuation and token.value == "["):
+            return True
+        if prev is not None and prev.value == "/" and token.value.startswith("*"):
+            return True
+        prev = token
+    return False
+
+
+DESTRUCTIVE_KEYWORDS = ("drop", "shutdown", "delete", "truncate", "alter")
+
+
 def is_destructive(queries):
     """Returns if any of the queries in *queries* is destructive."""
-    keywords = ("drop", "shutdown", "delete", "truncate", "alter")
-    return queries_start_with(queries, keywords)
+    return queries_start_with(queries, DESTRUCTIVE_KEYWORDS)
+
+
+def is_destructive_statement(statement):
+    """Returns if the parsed *statement*, as yielded by read_queries(), is
+    destructive."""
+    token = statement.token_first(skip_cm=True)
+    return token is not None and token.value.lower() in DESTRUCTIVE_KEYWORDS
 
 
 if __name__ == "__main__":
@@ -4,14 +4,121 @@ import logging
 import os
 import sys
 import platform
-import shlex
+from contextlib import contextmanager
 
 from litecli import __version__
 from litecli.packages.special import iocommands
 from .main import special_command, RAW_QUERY, PARSED_QUERY
+from .utils import split_args
 
 log = logging.getLogger(__name__)
 
+# The columns returned by the catalog queries below never change, so their
+# headers are spelled out instead of being read from cur.description.
+TABLES_HEADERS = ["name"]
+INDEXES_HEADERS = ["name"]
+SCHEMA_HEADERS = ["sql"]
+DATABASE_LIST_HEADERS = ["seq", "name", "file"]
+TABLE_INFO_HEADERS = ["cid", "name", "type", "notnull", "dflt_value", "pk"]
+
+# Read buffer for the .import CSV file and the size of the sample used to
+# detect its dialect.
+IMPORT_READ_BUFFER = 1 << 20
+IMPORT_SNIFF_SIZE = 64 * 1024
+
+# Pragmas applied for the duration of an .import. They skip the fsync, so a
+# crash during the import can lose the data. journal_mode is left alone:
+# leaving WAL mode fails while any other connection has the file open. So is
+# temp_store: changing it drops every TEMP table on the connection.
+IMPORT_PRAGMAS = (
+    ("synchronous", "OFF"),
+    ("cache_size", "-65536"),
+)
+
+
+# Delimiters recognized by sniff_dialect() without falling back to csv.Sniffer.
+SNIFF_DELIMITERS = ",;\t|"
+
+
+def sniff_dialect(sample):
+    """Guess the csv dialect of `sample`.
+
+    The first few lines are checked for a delimiter that occurs the same
+    number of times on every line. csv.Sniffer is slow and easily fooled, so
+    it's only consulted when that doesn't give a single answer.
+    """
+    lines = sample.splitlines()
+    if len(sample) >= IMPORT_SNIFF_SIZE and len(lines) > 1:
+        # The last line is probably cut short.
+        lines.pop()
+    lines = lines[:10]
+
+    candidates = []
+    for delimiter in SNIFF_DELIMITERS:
+        counts = {line.count(delimiter) for line in lines}
+        if len(counts) == 1 and 0 not in counts:
+            candidates.append(delimiter)
+
+    if len(candidates) != 1:
+        return csv.Sniffer().sniff(sample)
+
+    delimiter = candidates[0]
+    # Like csv.Sniffer, skip the space after a delimiter when every delimiter
+    # is followed by one ("name, city").
+    initial_space = all(line.count(delimiter) == line.count(delimiter + " ") for line in lines)
+    fields = [field.strip() for line in lines for field in line.split(delimiter)]
+
+    quotechar = '"'
+    quoted = [field for field in fields if field.startswith("'")]
+    if quoted:
+        # A leading apostrophe alone ("'tis") isn't quoting.
+        if not all(len(field) > 1 and field.endswith("'") for field in quoted):
+            return csv.Sniffer().sniff(sample)
+        quotechar = "'"
+
+    class dialect(csv.excel):
+        pass
+
+    dialect.delimiter = delimiter
+    dialect.quotechar = quotechar
+    dialect.skipinitialspace = initial_space
+    return dialect
+
+
+def table_column_count(cur, table):
+    """Return the number of columns in `table`."""
+    cur.execute("SELECT count(*) FROM pragma_table_info(?)", (table,))
+    return cur.fetchone()[0]
+
+
+@contextmanager
+def fast_insert_pragmas(cur):
+    """Apply IMPORT_PRAGMAS for the duration of the block and restore the
+    previous values afterwards."""
+    previous = []
+    try:
+        for name, value in IMPORT_PRAGMAS:
+            cur.execute("PRAGMA %s" % name)
+            previous.append((name, cur.fetchone()[0]))
+            cur.execute("PRAGMA %s=%s" % (name, value))
+        yield
+    finally:
+        for name, value in reversed(previous):
+            cur.execute("PRAGMA %s=%s" % (name, value))
+
+
+LIST_TABLES_QUERY = """
+    SELECT name FROM sqlite_master
+    WHERE type IN ('table','view') AND name NOT LIKE 'sqlite_%'
+    ORDER BY 1
+"""
+
+LIST_TABLES_FILTERED_QUERY = """
+    SELECT name FROM sqlite_master
+    WHERE type IN ('table','view') AND name LIKE ? AND name NOT LIKE 'sqlite_%'
+    ORDER BY 1
+"""
+
 
 @special_command(
     ".tables",
@@ -24,27 +131,15 @@ log = logging.getLogger(__name__)
 def list_tables(cur, arg=None, arg_type=PARSED_QUERY, verbose=False):
     if arg:
         args = ("{0}%".format(arg),)
-        query = """
-            SELECT name FROM sqlite_master
-            WHERE type IN ('table','view') AND name LIKE ? AND name NOT LIKE 'sqlite_%'
-            ORDER BY 1
-        """
+        query = LIST_TABLES_FILTERED_QUERY
     else:
-        args = tuple()
-        query = """
-            SELECT name FROM sqlite_master
-            WHERE type IN ('table','view') AND name NOT LIKE 'sqlite_%'
-            ORDER BY 1
-        """
+        args = ()
+        query = LIST_TABLES_QUERY
 
     log.debug(query)
     cur.execute(query, args)
     tables = cur.fetchall()
     status = ""
-    if cur.description:
-        headers = [x[0] for x in cur.description]
-    else:
-        return [(None, None, None, "")]
 
     # if verbose and arg:
     #     query = "SELECT sql FROM sqlite_master WHERE name LIKE ?"
@@ -52,7 +147,7 @@ def list_tables(cur, arg=None, arg_type=PARSED_QUERY, verbose=False):
     #     cur.execute(query)
     #     status = cur.fetchone()[1]
 
-    return [(None, tables, headers, status)]
+    return [(None, tables, TABLES_HEADERS, status)]
 
 
 @special_command(
@@ -82,12 +177,8 @@ def show_schema(cur, arg=None, **_):
     cur.execute(query, args)
     tables = cur.fetchall()
     status = ""
-    if cur.description:
-        headers = [x[0] for x in cur.description]
-    else:
-        return [(None, None, None, "")]
 
-    return [(None, tables, headers, status)]
+    return [(None, tables, SCHEMA_HEADERS, status)]
 
 
 @special_command(
@@ -102,11 +193,7 @@ def list_databases(cur, **_):
     query = "PRAGMA database_list"
     log.debug(query)
     cur.execute(query)
-    if cur.description:
-        headers = [x[0] for x in cur.description]
-        return [(None, cur, headers, "")]
-    else:
-        return [(None, None, None, "")]
+    return [(None, cur, DATABASE_LIST_HEADERS, "")]
 
 
 @special_command(
@@ -137,11 +224,7 @@ def list_indexes(cur, arg=None, arg_type=PARSED_QUERY, verbose=False):
     cur.execute(query, args)
     indexes = cur.fetchall()
     status = ""
-    if cur.description:
-        headers = [x[0] for x in cur.description]
-    else:
-        return [(None, None, None, "")]
-    return [(None, indexes, headers, status)]
+    return [(None, indexes, INDEXES_HEADERS, status)]
 
 
 @special_command(
@@ -195,7 +278,7 @@ def status(cur, **_):
     case_sensitive=True,
 )
 def load_extension(cur, arg, **_):
-    args = shlex.split(arg)
+    args = split_args(arg)
     if len(args) != 1:
         raise TypeError(".load accepts exactly one path")
     path = args[0]
@@ -225,12 +308,8 @@ def describe(cur, arg, **_):
     cur.execute(query)
     tables = cur.fetchall()
     status = ""
-    if cur.description:
-        headers = [x[0] for x in cur.description]
-    else:
-        return [(None, None, None, "")]
 
-    return [(None, tables, headers, status)]
+    return [(None, tables, TABLE_INFO_HEADERS, status)]
 
 
 @special_command(
@@ -241,32 +320,41 @@ def describe(cur, arg, **_):
     case_sensitive=True,
 )
 def import_file(cur, arg=None, **_):
-    def split(s):
-        # this is a modification of shlex.split function, just to make it support '`',
-        # because table name might contain '`' character.
-        lex = shlex.shlex(s, posix=True)
-        lex.whitespace_split = True
-        lex.commenters = ""
-        lex.quotes += "`"
-        return list(lex)
-
-    args = split(arg)
+    # Also accept '`' as a quote, because table name might contain '`' character.
+    args = split_args(arg, quotes="`")
     log.debug("[arg = %r], [args = %r]", arg, args)
     if len(args) != 2:
         raise TypeError("Usage: .import filename table")
 
     filename, table = args
-    cur.execute('PRAGMA table_info("%s")' % table)
-    ncols = len(cur.fetchall())
-    insert_tmpl = 'INSERT INTO "%s" VALUES (?%s)' % (table, ",?" * (ncols - 1))
+    ncols = table_column_count(cur, table)
 
-    with open(filename, "r") as csvfile:
-        dialect = csv.Sniffer().sniff(csvfile.read(1024))
+    # newline="" lets the csv module handle line endings itself, as its docs
+    # recommend, and the large buffer cuts down on read syscalls.
+    with fast_insert_pragmas(cur), open(filename, "r", buffering=IMPORT_READ_BUFFER, newline="") as csvfile:
+        dialect = sniff_dialect(csvfile.read(IMPORT_SNIFF_SIZE))
         csvfile.seek(0)
         reader = csv.reader(csvfile, dialect)
+        ninserted, nignored = insert_csv_rows(cur, reader, filename, table, ncols)
+
+    status = "Inserted %d rows into %s" % (ninserted, table)
+    if nignored > 0:
+        status += " (%d rows are ignored)" % nignored
+    return [(None, None, None, status)]
+
+
+def insert_csv_rows(cur, reader, filename, table, ncols):
+    """Insert the rows from the csv `reader` into `table` in one transaction.
 
-        cur.execute("BEGIN")
-        ninserted, nignored = 0, 0
+    Returns a (ninserted, nignored) tuple. Rows that don't have `ncols`
+    fields are reported on stderr and skipped.
+    """
+    insert_tmpl = 'INSERT INTO "%s" VALUES (?%s)' % (table, ",?" * (ncols - 1))
+
+    nignored = 0
+
+    def valid_rows():
+        nonlocal nignored
         for i, row in enumerate(reader):
             if len(row) != ncols:
                 print(
@@ -275,11 +363,17 @@ def import_file(cur, arg=None, **_):
                 )
                 nignored += 1
                 continue
-            cur.execute(insert_tmpl, row)
-            ninserted += 1
-        cur.execute("COMMIT")
-
-    status = "Inserted %d rows into %s" % (ninserted, table)
-    if nignored > 0:
-        status += " (%d rows are ignored)" % nignored
-    return [(None, None, None, status)]
+            yield row
+
+    cur.execute("BEGIN")
+    # executemany pulls the rows straight from the reader, so the file is
+    # never held in memory and the insert loop runs in C.
+    try:
+        cur.executemany(insert_tmpl, valid_rows())
+    except Exception:
+        cur.execute("ROLLBACK")
+        raise
+    ninserted = cur.rowcount
+    cur.execute("COMMIT")
+
+    return ninserted, nignored
@@ -40,6 +40,9 @@ Examples:
     def list(self):
         return self.config.get(self.section_name, [])
 
+    def items(self):
+        return list(self.config.get(self.section_name, {}).items())
+
     def get(self, name):
         return self.config.get(self.section_name, {}).get(name, None)
 
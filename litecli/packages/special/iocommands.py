@@ -1,10 +1,10 @@
 from __future__ import unicode_literals
+import functools
 import os
 import re
 import locale
 import logging
 import subprocess
-import shlex
 from io import open
 from time import sleep
 
@@ -15,7 +15,7 @@ from configobj import ConfigObj
 from . import export
 from .main import special_command, NO_QUERY, PARSED_QUERY
 from .favoritequeries import FavoriteQueries
-from .utils import handle_cd_command
+from .utils import handle_cd_command, split_args
 from litecli.packages.prompt_utils import confirm_destructive_query
 
 use_expanded_output = False
@@ -27,6 +27,12 @@ pipe_once_process = None
 written_to_pipe_once_process = False
 favoritequeries = FavoriteQueries(ConfigObj())
 
+# Matches the \e editor markers at the start or end of a query.
+_editor_pattern = re.compile(r"^(?:\\e)+|(?:\\e)+$")
+
+# Matches the $N and ? placeholders of a favorite query.
+_subst_pattern = re.compile(r"\$(\d+)|\?")
+
 
 @export
 def set_favorite_queries(config):
@@ -124,9 +130,7 @@ def get_editor_query(sql):
     # The reason we can't simply do .strip('\e') is that it strips characters,
     # not a substring. So it'll strip "e" in the end of the sql also!
     # Ex: "select * from style\e" -> "select * from styl".
-    pattern = re.compile(r"(^\\e|\\e$)")
-    while pattern.search(sql):
-        sql = pattern.sub("", sql)
+    sql = _editor_pattern.sub("", sql)
 
     return sql
 
@@ -186,14 +190,14 @@ def execute_favorite_query(cur, arg, verbose=False, **_):
 
     """Parse out favorite name and optional substitution parameters"""
     name, _, arg_str = arg.partition(" ")
-    args = shlex.split(arg_str)
+    args = split_args(arg_str)
 
     query = favoritequeries.get(name)
     if query is None:
         message = "No favorite query: %s" % (name)
         yield (None, None, None, message)
     elif "?" in query:
-        for sql in sqlparse.split(query):
+        for sql in split_queries(query):
             sql = sql.rstrip(";")
             title = "> %s" % (sql) if verbose else None
             cur.execute(sql, args)
@@ -207,7 +211,7 @@ def execute_favorite_query(cur, arg, verbose=False, **_):
         if arg_error:
             yield (None, None, None, arg_error)
         else:
-            for sql in sqlparse.split(query):
+            for sql in split_queries(query):
                 sql = sql.rstrip(";")
                 title = "> %s" % (sql) if verbose else None
                 cur.execute(sql)
@@ -218,12 +222,22 @@ def execute_favorite_query(cur, arg, verbose=False, **_):
                     yield (title, None, None, None)
 
 
+@functools.lru_cache(maxsize=128)
+def split_queries(query):
+    """Split `query` into its statements.
+
+    sqlparse is slow, and favorite and watch queries are run over and over
+    with the same text, so the result is cached.
+    """
+    return tuple(sqlparse.split(query))
+
+
 def list_favorite_queries():
     """List of all favorite queries.
     Returns (title, rows, headers, status)"""
 
     headers = ["Name", "Query"]
-    rows = [(r, favoritequeries.get(r)) for r in favoritequeries.list()]
+    rows = favoritequeries.items()
 
     if not rows:
         status = "\nNo favorite queries found." + favoritequeries.usage
@@ -234,24 +248,49 @@ def list_favorite_queries():
 
 def subst_favorite_query_args(query, args):
     """replace positional parameters ($1...$N) in query."""
-    for idx, val in enumerate(args):
-        shell_subst_var = "$" + str(idx + 1)
-        question_subst_var = "?"
-        if shell_subst_var in query:
-            query = query.replace(shell_subst_var, val)
-        elif question_subst_var in query:
-            query = query.replace(question_subst_var, val, 1)
+    # Each argument fills its $N placeholder if the query has one, otherwise
+    # the next free "?". The query is then rewritten in a single pass.
+    matches = list(_subst_pattern.finditer(query))
+    shell_vars = {int(m.group(1)) for m in matches if m.group(1)}
+    nquestions = len(matches) - sum(1 for m in matches if m.group(1))
+
+    shell_values = {}
+    question_values = []
+    too_many = False
+    for idx, val in enumerate(args, 1):
+        if idx in shell_vars:
+            shell_values[idx] = val
+        elif len(question_values) < nquestions:
+            question_values.append(val)
+        else:
+            too_many = True
+            break
+
+    missing = []
+    next_question = iter(question_values)
+
+    def replace(match):
+        if match.group(1):
+            value = shell_values.get(int(match.group(1)))
         else:
-            return [
-                None,
-                "Too many arguments.\nQuery does not have enough place holders to substitute.\n" + query,
-            ]
+            value = next(next_question, None)
+        if value is None:
+            missing.append(match.group(0))
+            return match.group(0)
+        return value
+
+    query = _subst_pattern.sub(replace, query)
+
+    if too_many:
+        return [
+            None,
+            "Too many arguments.\nQuery does not have enough place holders to substitute.\n" + query,
+        ]
 
-    match = re.search(r"\?|\$\d+", query)
-    if match:
+    if missing:
         return [
             None,
-            "missing substitution for " + match.group(0) + " in query:\n  " + query,
+            "missing substitution for " + missing[0] + " in query:\n  " + query,
         ]
 
     return [query, None]
@@ -367,8 +406,14 @@ def no_tee(arg, **_):
 def write_tee(output):
     global tee_file
     if tee_file:
-        click.echo(output, file=tee_file, nl=False)
-        click.echo("\n", file=tee_file, nl=False)
+        # Files get the text without styles, like click.echo would write it.
+        # The file is flushed once per result set by flush_tee(), not per line.
+        tee_file.write(click.unstyle(output) + "\n")
+
+
+@export
+def flush_tee():
+    if tee_file:
         tee_file.flush()
 
 
@@ -393,12 +438,17 @@ def set_once(arg, **_):
 def write_once(output):
     global once_file, written_to_once_file
     if output and once_file:
-        click.echo(output, file=once_file, nl=False)
-        click.echo("\n", file=once_file, nl=False)
-        once_file.flush()
+        # Like the tee file, flushed once per result set by flush_once().
+        once_file.write(click.unstyle(output) + "\n")
         written_to_once_file = True
 
 
+@export
+def flush_once():
+    if once_file:
+        once_file.flush()
+
+
 @export
 def unset_once_if_written():
     """Unset the once file, if it has been written to."""
@@ -411,7 +461,7 @@ def unset_once_if_written():
 @special_command("\\pipe_once", "\\| command", "Send next result to a subprocess.", aliases=("\\|",))
 def set_pipe_once(arg, **_):
     global pipe_once_process, written_to_pipe_once_process
-    pipe_once_cmd = shlex.split(arg)
+    pipe_once_cmd = split_args(arg)
     if len(pipe_once_cmd) == 0:
         raise OSError("pipe_once requires a command")
     written_to_pipe_once_process = False
@@ -432,8 +482,7 @@ def write_pipe_once(output):
     global pipe_once_process, written_to_pipe_once_process
     if output and pipe_once_process:
         try:
-            click.echo(output, file=pipe_once_process.stdin, nl=False)
-            click.echo("\n", file=pipe_once_process.stdin, nl=False)
+            pipe_once_process.stdin.write(click.unstyle(output) + "\n")
         except (IOError, OSError) as e:
             pipe_once_process.terminate()
             raise OSError("Failed writing to pipe_once subprocess: {}".format(e.strerror))
@@ -494,15 +543,14 @@ def watch_query(arg, **kwargs):
     elif destructive_prompt is True:
         click.secho("Your call!")
     cur = kwargs["cur"]
-    sql_list = [(sql.rstrip(";"), "> {0!s}".format(sql)) for sql in sqlparse.split(statement)]
+    sql_list = [(sql.rstrip(";"), "> {0!s}".format(sql)) for sql in split_queries(statement)]
     old_pager_enabled = is_pager_enabled()
-    while True:
-        if clear_screen:
-            click.clear()
-        try:
-            # Somewhere in the code the pager its activated after every yield,
-            # so we disable it in every iteration
-            set_pager_enabled(False)
+    # The pager is kept off for the whole watch and restored once it ends.
+    set_pager_enabled(False)
+    try:
+        while True:
+            if clear_screen:
+                click.clear()
             for sql, title in sql_list:
                 cur.execute(sql)
                 if cur.description:
@@ -511,10 +559,10 @@ def watch_query(arg, **kwargs):
                 else:
                     yield (title, None, None, None)
             sleep(seconds)
-        except KeyboardInterrupt:
-            # This prints the Ctrl-C character in its own line, which prevents
-            # to print a line with the cursor positioned behind the prompt
-            click.secho("", nl=True)
-            raise StopIteration
-        finally:
-            set_pager_enabled(old_pager_enabled)
+    except KeyboardInterrupt:
+        # This prints the Ctrl-C character in its own line, which prevents
+        # to print a line with the cursor positioned behind the prompt
+        click.secho("", nl=True)
+        raise StopIteration
+    finally:
+        set_pager_enabled(old_pager_enabled)
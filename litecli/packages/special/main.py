@@ -39,8 +39,10 @@ class CommandNotFound(Exception):
 @export
 def parse_special_command(sql):
     command, _, arg = sql.partition(" ")
-    verbose = "+" in command
-    command = command.strip().replace("+", "")
+    # Verbosity is only ever given as a trailing "+", e.g. "\dt+".
+    verbose = command[-1:] == "+"
+    if verbose:
+        command = command[:-1]
     return (command, verbose, arg.strip())
 
 
@@ -96,6 +98,23 @@ def register_special_command(
         )
 
 
+def find_special_command(command):
+    """Return the SpecialCommand registered for *command*, or None."""
+    special_cmd = COMMANDS.get(command)
+    if special_cmd is None:
+        # Case-insensitive commands are registered under their lower-cased name.
+        special_cmd = COMMANDS.get(command.lower())
+        if special_cmd is not None and special_cmd.case_sensitive:
+            return None
+    return special_cmd
+
+
+@export
+def is_special_command(sql):
+    """Return True if *sql* starts with a registered special command."""
+    return find_special_command(parse_special_command(sql)[0]) is not None
+
+
 @export
 def execute(cur, sql):
     """Execute a special command and return the results. If the special command
@@ -103,15 +122,9 @@ def execute(cur, sql):
     """
     command, verbose, arg = parse_special_command(sql)
 
-    if (command not in COMMANDS) and (command.lower() not in COMMANDS):
-        raise CommandNotFound
-
-    try:
-        special_cmd = COMMANDS[command]
-    except KeyError:
-        special_cmd = COMMANDS[command.lower()]
-        if special_cmd.case_sensitive:
-            raise CommandNotFound("Command not found: %s" % command)
+    special_cmd = find_special_command(command)
+    if special_cmd is None:
+        raise CommandNotFound("Command not found: %s" % command)
 
     if special_cmd.arg_type == NO_QUERY:
         return special_cmd.handler()
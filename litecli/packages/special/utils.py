@@ -1,4 +1,5 @@
 import os
+import shlex
 import subprocess
 
 
@@ -17,6 +18,21 @@ def handle_cd_command(arg):
         return False, e.strerror
 
 
+def split_args(arg, quotes=""):
+    """Split the arguments of a special command like shlex.split does.
+
+    Arguments rarely contain quotes or escapes, so plain str.split is used
+    unless they do. Extra quote characters can be given in `quotes`.
+    """
+    if not any(c in arg for c in "\"'\\" + quotes):
+        return arg.split()
+    lex = shlex.shlex(arg, posix=True)
+    lex.whitespace_split = True
+    lex.commenters = ""
+    lex.quotes += quotes
+    return list(lex)
+
+
 def format_uptime(uptime_in_seconds):
     """Format number of seconds into human-readable string.
 
@@ -1,8 +1,9 @@
 from __future__ import print_function
 from __future__ import unicode_literals
 import logging
-from re import compile, escape
-from collections import Counter
+from bisect import bisect_left
+from re import compile
+from collections import Counter, OrderedDict
 
 from prompt_toolkit.completion import Completer, Completion
 
@@ -13,6 +14,53 @@ from .packages.filepaths import parse_path, complete_path, suggest_path
 
 _logger = logging.getLogger(__name__)
 
+# Number of get_completions results kept for repeated keystrokes.
+COMPLETION_CACHE_SIZE = 256
+
+
+class PrefixIndex(object):
+    """A sorted, lower-cased copy of a completion collection.
+
+    Lets find_matches look up the items starting with a prefix with a binary
+    search instead of scanning the whole collection.
+    """
+
+    def __init__(self, items):
+        self.entries = sorted((item.lower(), item) for item in items)
+
+    def __iter__(self):
+        return (item for _, item in self.entries)
+
+    def startswith(self, prefix):
+        """Yield the items whose lower-cased form starts with *prefix*."""
+        entries = self.entries
+        for i in range(bisect_left(entries, (prefix,)), len(entries)):
+            lowered, item = entries[i]
+            if not lowered.startswith(prefix):
+                break
+            yield item
+
+
+def fuzzy_match(text, item):
+    """Find the characters of *text*, in order, in *item*.
+
+    Returns a (length, start) tuple for the leftmost shortest span of *item*
+    containing them, or None if there is none. This is what searching with
+    the regex "t.*?e.*?x.*?t" gives, without the cost of the regex engine.
+    """
+    if not text:
+        return 0, 0
+    start = item.find(text[0])
+    if start < 0:
+        return None
+    end = start + 1
+    for char in text[1:]:
+        end = item.find(char, end)
+        if end < 0:
+            return None
+        end += 1
+    return end - start, start
+
 
 class SQLCompleter(Completer):
     keywords = [
@@ -258,19 +306,37 @@ class SQLCompleter(Completer):
         for x in self.keywords:
             self.reserved_words.update(x.split())
         self.name_pattern = compile(r"^[_a-z][_a-z0-9\$]*$")
+        self.function_names = frozenset(self.functions)
+        self.escaped_name_cache = {}
+        self.keyword_index = PrefixIndex(self.keywords)
+        self.function_index = PrefixIndex(self.functions)
 
         self.special_commands = []
+        self.special_command_index = PrefixIndex(self.special_commands)
         self.table_formats = supported_formats
+        self.table_format_index = PrefixIndex(supported_formats)
         if keyword_casing not in ("upper", "lower", "auto"):
             keyword_casing = "auto"
         self.keyword_casing = keyword_casing
+        self.completion_cache = OrderedDict()
         self.reset_completions()
 
     def escape_name(self, name):
-        if name and ((not self.name_pattern.match(name)) or (name.upper() in self.reserved_words) or (name.upper() in self.functions)):
-            name = "`%s`" % name
-
-        return name
+        # Column names such as "id" repeat across tables, so remember the
+        # answer. It only depends on reserved_words and function_names, which
+        # are fixed once the completer is created.
+        escaped = self.escaped_name_cache.get(name)
+        if escaped is not None:
+            return escaped
+
+        escaped = name
+        if name:
+            upper_name = name.upper()
+            if not self.name_pattern.match(name) or upper_name in self.reserved_words or upper_name in self.function_names:
+                escaped = "`%s`" % name
+            self.escaped_name_cache[name] = escaped
+
+        return escaped
 
     def unescape_name(self, name):
         """Unquote a string."""
@@ -283,18 +349,24 @@ class SQLCompleter(Completer):
         return [self.escape_name(name) for name in names]
 
     def extend_special_commands(self, special_commands):
+        self.completion_cache.clear()
         # Special commands are not part of all_completions since they can only
         # be at the beginning of a line.
         self.special_commands.extend(special_commands)
+        self.special_command_index = PrefixIndex(self.special_commands)
 
     def extend_database_names(self, databases):
+        self.completion_cache.clear()
         self.databases.extend(databases)
 
     def extend_keywords(self, additional_keywords):
+        self.completion_cache.clear()
         self.keywords.extend(additional_keywords)
+        self.keyword_index = PrefixIndex(self.keywords)
         self.all_completions.update(additional_keywords)
 
     def extend_schemata(self, schema):
+        self.completion_cache.clear()
         if schema is None:
             return
         metadata = self.dbmetadata["tables"]
@@ -312,6 +384,7 @@ class SQLCompleter(Completer):
         :param kind: either 'tables' or 'views'
         :return:
         """
+        self.completion_cache.clear()
         # 'data' is a generator object. It can throw an exception while being
         # consumed. This could happen if the user has launched the app without
         # specifying a database name. This exception must be handled to prevent
@@ -343,6 +416,7 @@ class SQLCompleter(Completer):
         :param kind: either 'tables' or 'views'
         :return:
         """
+        self.completion_cache.clear()
         # 'column_data' is a generator object. It can throw an exception while
         # being consumed. This could happen if the user has launched the app
         # without specifying a database name. This exception must be handled to
@@ -358,6 +432,7 @@ class SQLCompleter(Completer):
             self.all_completions.add(column)
 
     def extend_functions(self, func_data):
+        self.completion_cache.clear()
         # 'func_data' is a generator object. It can throw an exception while
         # being consumed. This could happen if the user has launched the app
         # without specifying a database name. This exception must be handled to
@@ -376,13 +451,16 @@ class SQLCompleter(Completer):
             self.all_completions.add(func[0])
 
     def set_dbname(self, dbname):
+        self.completion_cache.clear()
         self.dbname = dbname
 
     def reset_completions(self):
+        self.completion_cache.clear()
         self.databases = []
         self.dbname = ""
         self.dbmetadata = {"tables": {}, "views": {}, "functions": {}}
-        self.all_completions = set(self.keywords + self.functions)
+        self.all_completions = set(self.keywords)
+        self.all_completions.update(self.functions)
 
     @staticmethod
     def find_matches(
@@ -409,129 +487,164 @@ class SQLCompleter(Completer):
         last = last_word(text, include=punctuations)
         text = last.lower()
 
+        # No need to sort the collection: the completions are sorted below on
+        # a key that ends with the item itself.
         completions = []
 
         if fuzzy:
-            regex = ".*?".join(map(escape, text))
-            pat = compile("(%s)" % regex)
-            for item in sorted(collection):
-                r = pat.search(item.lower())
-                if r:
-                    completions.append((len(r.group()), r.start(), item))
+            for item in collection:
+                match = fuzzy_match(text, item.lower())
+                if match:
+                    completions.append((match[0], match[1], item))
+        elif start_only:
+            if isinstance(collection, PrefixIndex):
+                matches = collection.startswith(text)
+            else:
+                matches = (item for item in collection if item.lower().startswith(text))
+            completions = [(len(text), 0, item) for item in matches]
         else:
-            match_end_limit = len(text) if start_only else None
-            for item in sorted(collection):
-                match_point = item.lower().find(text, 0, match_end_limit)
+            for item in collection:
+                match_point = item.lower().find(text)
                 if match_point >= 0:
                     completions.append((len(text), match_point, item))
 
         if casing == "auto":
             casing = "lower" if last and last[-1].islower() else "upper"
 
-        def apply_case(kw):
-            if casing == "upper":
-                return kw.upper()
-            return kw.lower()
+        start_position = -len(text)
+        if casing is None:
+            return (Completion(z, start_position) for x, y, z in sorted(completions))
 
-        return (Completion(z if casing is None else apply_case(z), -len(text)) for x, y, z in sorted(completions))
+        apply_case = str.upper if casing == "upper" else str.lower
+        return (Completion(apply_case(z), start_position) for x, y, z in sorted(completions))
 
     def get_completions(self, document, complete_event):
+        # Completions only depend on the text and the metadata, so repeated
+        # keystrokes (e.g. backspace and retype) are answered from a cache
+        # that is cleared whenever the metadata changes.
+        cache_key = (document.text, document.cursor_position)
+        cached = self.completion_cache.get(cache_key)
+        if cached is not None:
+            self.completion_cache.move_to_end(cache_key)
+            return list(cached)
+
         word_before_cursor = document.get_word_before_cursor(WORD=True)
         completions = []
+        cacheable = True
         suggestions = suggest_type(document.text, document.text_before_cursor)
 
         for suggestion in suggestions:
-            _logger.debug("Suggestion type: %r", suggestion["type"])
-
-            if suggestion["type"] == "column":
-                tables = suggestion["tables"]
-                _logger.debug("Completion column scope: %r", tables)
-                scoped_cols = self.populate_scoped_cols(tables)
-                if suggestion.get("drop_unique"):
-                    # drop_unique is used for 'tb11 JOIN tbl2 USING (...'
-                    # which should suggest only columns that appear in more than
-                    # one table
-                    scoped_cols = [col for (col, count) in Counter(scoped_cols).items() if count > 1 and col != "*"]
-
-                cols = self.find_matches(word_before_cursor, scoped_cols)
-                completions.extend(cols)
-
-            elif suggestion["type"] == "function":
-                # suggest user-defined functions using substring matching
-                funcs = self.populate_schema_objects(suggestion["schema"], "functions")
-                user_funcs = self.find_matches(word_before_cursor, funcs)
-                completions.extend(user_funcs)
-
-                # suggest hardcoded functions using startswith matching only if
-                # there is no schema qualifier. If a schema qualifier is
-                # present it probably denotes a table.
-                # eg: SELECT * FROM users u WHERE u.
-                if not suggestion["schema"]:
-                    predefined_funcs = self.find_matches(
-                        word_before_cursor,
-                        self.functions,
-                        start_only=True,
-                        fuzzy=False,
-                        casing=self.keyword_casing,
-                    )
-                    completions.extend(predefined_funcs)
-
-            elif suggestion["type"] == "table":
-                tables = self.populate_schema_objects(suggestion["schema"], "tables")
-                tables = self.find_matches(word_before_cursor, tables)
-                completions.extend(tables)
-
-            elif suggestion["type"] == "view":
-                views = self.populate_schema_objects(suggestion["schema"], "views")
-                views = self.find_matches(word_before_cursor, views)
-                completions.extend(views)
-
-            elif suggestion["type"] == "alias":
-                aliases = suggestion["aliases"]
-                aliases = self.find_matches(word_before_cursor, aliases)
-                completions.extend(aliases)
-
-            elif suggestion["type"] == "database":
-                dbs = self.find_matches(word_before_cursor, self.databases)
-                completions.extend(dbs)
-
-            elif suggestion["type"] == "keyword":
-                keywords = self.find_matches(
-                    word_before_cursor,
-                    self.keywords,
-                    start_only=True,
-                    fuzzy=False,
-                    casing=self.keyword_casing,
-                    punctuations="many_punctuations",
-                )
-                completions.extend(keywords)
-
-            elif suggestion["type"] == "special":
-                special = self.find_matches(
-                    word_before_cursor,
-                    self.special_commands,
-                    start_only=True,
-                    fuzzy=False,
-                    punctuations="many_punctuations",
-                )
-                completions.extend(special)
-            elif suggestion["type"] == "favoritequery":
-                queries = self.find_matches(
-                    word_before_cursor,
-                    favoritequeries.list(),
-                    start_only=False,
-                    fuzzy=True,
-                )
-                completions.extend(queries)
-            elif suggestion["type"] == "table_format":
-                formats = self.find_matches(word_before_cursor, self.table_formats, start_only=True, fuzzy=False)
-                completions.extend(formats)
-            elif suggestion["type"] == "file_name":
-                file_names = self.find_files(word_before_cursor)
-                completions.extend(file_names)
+            suggestion_type = suggestion["type"]
+            _logger.debug("Suggestion type: %r", suggestion_type)
 
+            handler = self.suggestion_handlers.get(suggestion_type)
+            if handler is None:
+                continue
+            completions.extend(handler(self, suggestion, word_before_cursor))
+            # Favorite queries and file names can change behind our back.
+            if suggestion_type in ("favoritequery", "file_name"):
+                cacheable = False
+
+        if cacheable:
+            self.completion_cache[cache_key] = tuple(completions)
+            if len(self.completion_cache) > COMPLETION_CACHE_SIZE:
+                self.completion_cache.popitem(last=False)
         return completions
 
+    def complete_column(self, suggestion, word_before_cursor):
+        tables = suggestion["tables"]
+        _logger.debug("Completion column scope: %r", tables)
+        scoped_cols = self.populate_scoped_cols(tables)
+        if suggestion.get("drop_unique"):
+            # drop_unique is used for 'tb11 JOIN tbl2 USING (...'
+            # which should suggest only columns that appear in more than
+            # one table
+            scoped_cols = [col for (col, count) in Counter(scoped_cols).items() if count > 1 and col != "*"]
+
+        return self.find_matches(word_before_cursor, scoped_cols)
+
+    def complete_function(self, suggestion, word_before_cursor):
+        # suggest user-defined functions using substring matching
+        funcs = self.populate_schema_objects(suggestion["schema"], "functions")
+        completions = list(self.find_matches(word_before_cursor, funcs))
+
+        # suggest hardcoded functions using startswith matching only if
+        # there is no schema qualifier. If a schema qualifier is
+        # present it probably denotes a table.
+        # eg: SELECT * FROM users u WHERE u.
+        if not suggestion["schema"]:
+            predefined_funcs = self.find_matches(
+                word_before_cursor,
+                self.function_index,
+                start_only=True,
+                fuzzy=False,
+                casing=self.keyword_casing,
+            )
+            completions.extend(predefined_funcs)
+        return completions
+
+    def complete_table(self, suggestion, word_before_cursor):
+        tables = self.populate_schema_objects(suggestion["schema"], "tables")
+        return self.find_matches(word_before_cursor, tables)
+
+    def complete_view(self, suggestion, word_before_cursor):
+        views = self.populate_schema_objects(suggestion["schema"], "views")
+        return self.find_matches(word_before_cursor, views)
+
+    def complete_alias(self, suggestion, word_before_cursor):
+        return self.find_matches(word_before_cursor, suggestion["aliases"])
+
+    def complete_database(self, suggestion, word_before_cursor):
+        return self.find_matches(word_before_cursor, self.databases)
+
+    def complete_keyword(self, suggestion, word_before_cursor):
+        return self.find_matches(
+            word_before_cursor,
+            self.keyword_index,
+            start_only=True,
+            fuzzy=False,
+            casing=self.keyword_casing,
+            punctuations="many_punctuations",
+        )
+
+    def complete_special(self, suggestion, word_before_cursor):
+        return self.find_matches(
+            word_before_cursor,
+            self.special_command_index,
+            start_only=True,
+            fuzzy=False,
+            punctuations="many_punctuations",
+        )
+
+    def complete_favoritequery(self, suggestion, word_before_cursor):
+        return self.find_matches(
+            word_before_cursor,
+            favoritequeries.list(),
+            start_only=False,
+            fuzzy=True,
+        )
+
+    def complete_table_format(self, suggestion, word_before_cursor):
+        return self.find_matches(word_before_cursor, self.table_format_index, start_only=True, fuzzy=False)
+
+    def complete_file_name(self, suggestion, word_before_cursor):
+        return self.find_files(word_before_cursor)
+
+    # Maps a suggestion type from suggest_type to the method completing it.
+    suggestion_handlers = {
+        "column": complete_column,
+        "function": complete_function,
+        "table": complete_table,
+        "view": complete_view,
+        "alias": complete_alias,
+        "database": complete_database,
+        "keyword": complete_keyword,
+        "special": complete_special,
+        "favoritequery": complete_favoritequery,
+        "table_format": complete_table_format,
+        "file_name": complete_file_name,
+    }
+
     def find_files(self, word):
         """Yield matching directory or file names.
 
@@ -552,35 +665,25 @@ class SQLCompleter(Completer):
         :return: list of column names
         """
         columns = []
-        meta = self.dbmetadata
+        tables = self.dbmetadata["tables"]
+        views = self.dbmetadata["views"]
 
         for tbl in scoped_tbls:
             # A fully qualified schema.relname reference or default_schema
             # DO NOT escape schema names.
             schema = tbl[0] or self.dbname
             relname = tbl[1]
-            escaped_relname = self.escape_name(tbl[1])
 
             # We don't know if schema.relname is a table or view. Since
             # tables and views cannot share the same name, we can check one
             # at a time
-            try:
-                columns.extend(meta["tables"][schema][relname])
-
-                # Table exists, so don't bother checking for a view
-                continue
-            except KeyError:
-                try:
-                    columns.extend(meta["tables"][schema][escaped_relname])
-                    # Table exists, so don't bother checking for a view
-                    continue
-                except KeyError:
-                    pass
-
-            try:
-                columns.extend(meta["views"][schema][relname])
-            except KeyError:
-                pass
+            schema_tables = tables.get(schema, {})
+            cols = schema_tables.get(relname)
+            if cols is None:
+                cols = schema_tables.get(self.escape_name(relname))
+            if cols is None:
+                cols = views.get(schema, {}).get(relname, ())
+            columns.extend(cols)
 
         return columns
 
@@ -1,7 +1,14 @@
+import csv
+import io
+
 from litecli.packages.completion_engine import suggest_type
 from test_completion_engine import sorted_dicts
 from litecli.packages.special.utils import format_uptime
 from litecli.packages.special.utils import check_if_sqlitedotcommand
+from litecli.packages.special.utils import split_args
+from litecli.packages.special import dbcommands
+from litecli.sqlexecute import SQLExecute
+from litecli.packages.special import is_special_command, parse_special_command
 from utils import run, dbtest, assert_result_equal
 
 
@@ -91,6 +98,28 @@ def test_check_if_sqlitedotcommand():
         assert check_if_sqlitedotcommand(command) == expected_result
 
 
+def test_parse_special_command():
+    assert parse_special_command("\\dt") == ("\\dt", False, "")
+    assert parse_special_command("\\dt+ foo ") == ("\\dt", True, "foo")
+    assert parse_special_command(".schema+") == (".schema", True, "")
+    assert parse_special_command("") == ("", False, "")
+
+
+def test_is_special_command():
+    assert is_special_command("\\dt+ foo")
+    assert is_special_command("HELP")
+    assert is_special_command(".tables")
+    assert not is_special_command("select 1")
+    assert not is_special_command(".unknown")
+
+
+def test_split_args():
+    assert split_args("data.csv tbl") == ["data.csv", "tbl"]
+    assert split_args("'my data.csv' tbl") == ["my data.csv", "tbl"]
+    assert split_args("data.csv `my tbl`", quotes="`") == ["data.csv", "my tbl"]
+    assert split_args("data.csv `tbl`") == ["data.csv", "`tbl`"]
+
+
 @dbtest
 def test_special_d(executor):
     run(executor, """create table tst_tbl1(a text)""")
@@ -107,3 +136,117 @@ def test_special_d_w_arg(executor):
     assert_result_equal(
         results, headers=["cid", "name", "type", "notnull", "dflt_value", "pk"], rows=[(0, "a", "TEXT", 0, None, 0)], status=""
     )
+
+
+@dbtest
+def test_import_ignores_bad_rows(executor, tmp_path):
+    data_file = tmp_path / "data.csv"
+    data_file.write_text('"a",1\n"b",2\n"c",3\n"d"\n"e",5\n')
+    run(executor, """create table tbl1(one text, two int)""")
+
+    results = run(executor, """.import %s tbl1""" % data_file)
+    assert results[0]["status"] == "Inserted 4 rows into tbl1 (1 rows are ignored)"
+
+    results = run(executor, """select * from tbl1""")
+    assert results[0]["rows"] == [("a", 1), ("b", 2), ("c", 3), ("e", 5)]
+
+
+@dbtest
+def test_import_restores_pragmas(executor, tmp_path):
+    data_file = tmp_path / "data.csv"
+    data_file.write_text("t1,11\nt2,22\n")
+    run(executor, """create table tbl1(one text, two int)""")
+    before = run(executor, """select * from pragma_synchronous, pragma_journal_mode""")
+
+    results = run(executor, """.import %s tbl1""" % data_file)
+    assert results[0]["status"] == "Inserted 2 rows into tbl1"
+
+    after = run(executor, """select * from pragma_synchronous, pragma_journal_mode""")
+    assert after == before
+
+
+@dbtest
+def test_import_into_wal_database_with_other_connection(tmp_path):
+    data_file = tmp_path / "data.csv"
+    data_file.write_text("t1,11\nt2,22\n")
+    # A database of its own, so the shared test database stays out of WAL mode.
+    executor = SQLExecute(str(tmp_path / "wal.db"))
+    other = None
+    try:
+        run(executor, """pragma journal_mode=wal""")
+        run(executor, """create table tbl1(one text, two int)""")
+        other = SQLExecute(executor.dbname)
+        run(other, """select * from tbl1""")
+
+        results = run(executor, """.import %s tbl1""" % data_file)
+        assert results[0]["status"] == "Inserted 2 rows into tbl1"
+        assert run(executor, """pragma journal_mode""")[0]["rows"] == [("wal",)]
+    finally:
+        if other is not None:
+            other.conn.close()
+        executor.conn.close()
+
+
+@dbtest
+def test_import_after_alter_table(executor, tmp_path):
+    data_file = tmp_path / "data.csv"
+    data_file.write_text("t1,11\nt2,22\n")
+    run(executor, """create table tbl1(one text)""")
+
+    results = run(executor, """.import %s tbl1""" % data_file)
+    assert results[0]["status"] == "Inserted 0 rows into tbl1 (2 rows are ignored)"
+
+    run(executor, """alter table tbl1 add column two int""")
+    results = run(executor, """.import %s tbl1""" % data_file)
+    assert results[0]["status"] == "Inserted 2 rows into tbl1"
+
+
+@dbtest
+def test_import_after_recreating_temp_table(executor, tmp_path):
+    data_file = tmp_path / "data.csv"
+    data_file.write_text("t1,11\nt2,22\n")
+    run(executor, """create temp table t(a)""")
+    results = run(executor, """.import %s t""" % data_file)
+    assert results[0]["status"] == "Inserted 0 rows into t (2 rows are ignored)"
+
+    # Temp schema changes don't bump the main schema_version.
+    run(executor, """drop table t""")
+    run(executor, """create temp table t(a, b)""")
+    results = run(executor, """.import %s t""" % data_file)
+    assert results[0]["status"] == "Inserted 2 rows into t"
+
+
+@dbtest
+def test_import_keeps_temp_tables(executor, tmp_path):
+    data_file = tmp_path / "data.csv"
+    data_file.write_text("t1,11\nt2,22\n")
+    run(executor, """pragma temp_store=file""")
+    run(executor, """create temp table keep(x)""")
+    run(executor, """insert into keep values (1)""")
+    run(executor, """create table tbl1(one text, two int)""")
+
+    results = run(executor, """.import %s tbl1""" % data_file)
+    assert results[0]["status"] == "Inserted 2 rows into tbl1"
+    assert run(executor, """select * from keep""")[0]["rows"] == [(1,)]
+
+
+def test_sniff_dialect():
+    sniff_dialect = dbcommands.sniff_dialect
+    assert sniff_dialect("t1,11\nt2,22\n").delimiter == ","
+    assert sniff_dialect("a;1\nb;2\n").delimiter == ";"
+    assert sniff_dialect("a\t1\nb\t2\n").delimiter == "\t"
+
+    dialect = sniff_dialect("1|'a'\n2|'b'\n")
+    assert (dialect.delimiter, dialect.quotechar) == ("|", "'")
+
+    dialect = sniff_dialect("name, city\nbob, paris\n")
+    assert (dialect.delimiter, dialect.skipinitialspace) == (",", True)
+    assert list(csv.reader(io.StringIO("bob, paris\n"), dialect)) == [["bob", "paris"]]
+    assert sniff_dialect("t1,11\nt2,22\n").skipinitialspace is False
+
+    # A leading apostrophe that doesn't close a quoted field isn't a quote.
+    data = "'tis,1\nx,2\n"
+    assert list(csv.reader(io.StringIO(data), sniff_dialect(data))) == [["'tis", "1"], ["x", "2"]]
+
+    # Inconsistent rows fall back to csv.Sniffer.
+    assert sniff_dialect('"a",1\n"b"\n"c",3\n').delimiter == ","
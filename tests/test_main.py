@@ -7,6 +7,7 @@ import click
 from click.testing import CliRunner
 
 from litecli.main import cli, LiteCli
+from litecli.packages import special
 from litecli.packages.special.main import COMMANDS as SPECIAL_COMMANDS
 from utils import dbtest, run
 
@@ -224,6 +225,32 @@ def test_conditional_pager(monkeypatch):
     SPECIAL_COMMANDS["pager"].handler("")
 
 
+def test_output_flushes_tee_and_once(monkeypatch, tmp_path):
+    tee_path = tmp_path / "tee.txt"
+    once_path = tmp_path / "once.txt"
+    m = LiteCli(liteclirc=default_config_file)
+
+    class PromptBuffer:
+        class output:
+            def get_size():
+                return namedtuple("Size", "rows columns")(24, 80)
+
+    m.prompt_app = PromptBuffer()
+    m.sqlexecute = namedtuple("SQLExecute", ["dbname"])("test.db")
+    m.explicit_pager = False
+    monkeypatch.setattr(click, "secho", lambda s: None)
+    special.execute(None, "tee " + str(tee_path))
+    special.execute(None, ".once " + str(once_path))
+    try:
+        # Nothing else flushes the files while \watch keeps printing results.
+        m.output(["a", "b"], status="2 rows")
+        assert tee_path.read_text() == "a\nb\n"
+        assert once_path.read_text() == "a\nb\n"
+    finally:
+        special.close_tee()
+        special.unset_once_if_written()
+
+
 def test_reserved_space_is_integer():
     """Make sure that reserved space is returned as an integer."""
 
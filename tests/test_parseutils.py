@@ -1,9 +1,13 @@
+import io
+
 import pytest
 from litecli.packages.parseutils import (
     extract_tables,
     query_starts_with,
     queries_start_with,
     is_destructive,
+    is_destructive_statement,
+    read_queries,
 )
 
 
@@ -129,3 +133,24 @@ def test_queries_start_with():
 def test_is_destructive():
     sql = "use test;\n" "show databases;\n" "drop database foo;"
     assert is_destructive(sql) is True
+
+
+def test_read_queries():
+    sql = "select 1;\nselect\n  2; create table t(a text);\ninsert into t values ('x;y');"
+    chunks = [str(stmt) for stmt in read_queries(io.StringIO(sql), chunk_size=7)]
+    assert "".join(chunks).split() == sql.split()
+    for chunk in chunks:
+        assert chunk.strip().endswith(";")
+
+
+def test_read_queries_comment_across_chunks():
+    sql = "select 1;\n/* a;b */ select 1;"
+    for chunk_size in range(1, len(sql) + 1):
+        chunks = [str(stmt) for stmt in read_queries(io.StringIO(sql), chunk_size=chunk_size)]
+        assert [chunk.strip() for chunk in chunks] == ["select 1;", "/* a;b */ select 1;"]
+
+
+def test_is_destructive_statement():
+    sql = "select 1;\n/* cleanup */ DROP table t;\ndelete from u;"
+    statements = list(read_queries(io.StringIO(sql)))
+    assert [is_destructive_statement(stmt) for stmt in statements] == [False, True, True]
@@ -351,3 +351,33 @@ def test_file_name_completion(completer, complete_event, text, expected):
     result = list(completer.get_completions(Document(text=text, cursor_position=position), complete_event))
     expected = list([Completion(txt, pos) for txt, pos in expected])
     assert result == expected
+
+
+def test_fuzzy_match():
+    from litecli.sqlcompleter import fuzzy_match
+
+    assert fuzzy_match("", "users") == (0, 0)
+    assert fuzzy_match("urs", "users") == (5, 0)
+    assert fuzzy_match("ers", "users") == (3, 2)
+    assert fuzzy_match("ru", "users") is None
+
+
+def test_prefix_index():
+    from litecli.sqlcompleter import PrefixIndex
+
+    index = PrefixIndex(["SELECT", "SET", "savepoint", "DELETE"])
+    assert list(index.startswith("se")) == ["SELECT", "SET"]
+    assert list(index.startswith("sa")) == ["savepoint"]
+    assert list(index.startswith("x")) == []
+    assert sorted(index) == sorted(["SELECT", "SET", "savepoint", "DELETE"])
+
+
+def test_completion_cache_is_cleared_on_metadata_change(completer, complete_event):
+    text = "SELECT * FROM new"
+    position = len(text)
+    result = completer.get_completions(Document(text=text, cursor_position=position), complete_event)
+    assert result == []
+
+    completer.extend_relations([("new_table",)], kind="tables")
+    result = completer.get_completions(Document(text=text, cursor_position=position), complete_event)
+    assert result == [Completion(text="new_table", start_position=-3)]
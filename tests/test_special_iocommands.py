@@ -1,9 +1,12 @@
 import os
+import sqlite3
 import tempfile
 
 import pytest
+from configobj import ConfigObj
 
 import litecli.packages.special
+from litecli.packages.special.favoritequeries import FavoriteQueries
 
 
 def test_once_command():
@@ -18,6 +21,7 @@ def test_once_command():
     with tempfile.NamedTemporaryFile(delete=False) as f:
         litecli.packages.special.execute(None, ".once " + f.name)
         litecli.packages.special.write_once("hello world")
+        litecli.packages.special.flush_once()
         if os.name == "nt":
             assert f.read() == b"hello world\r\n"
         else:
@@ -26,6 +30,7 @@ def test_once_command():
         litecli.packages.special.execute(None, ".once -o " + f.name)
         litecli.packages.special.write_once("hello world line 1")
         litecli.packages.special.write_once("hello world line 2")
+        litecli.packages.special.unset_once_if_written()
         f.seek(0)
         if os.name == "nt":
             assert f.read() == b"hello world line 1\r\nhello world line 2\r\n"
@@ -57,3 +62,49 @@ def test_pipe_once_command():
             litecli.packages.special.unset_pipe_once_if_written()
             f.seek(0)
             assert f.read() == b"hello world\n"
+
+
+def test_subst_favorite_query_args():
+    subst = litecli.packages.special.iocommands.subst_favorite_query_args
+    assert subst("select $1, $2, $1", ["a", "b"]) == ["select a, b, a", None]
+    assert subst("select ?, ?", ["a", "b"]) == ["select a, b", None]
+    # $1 must not be substituted into $10.
+    assert subst("select $1, $10", ["a"]) == [None, "missing substitution for $10 in query:\n  select a, $10"]
+    # Substituted values are not scanned for placeholders again.
+    assert subst("select $1, $2", ["$2", "b"]) == ["select $2, b", None]
+
+
+def test_watch_query_keeps_pager_disabled():
+    conn = sqlite3.connect(":memory:")
+    litecli.packages.special.set_pager_enabled(True)
+    results = litecli.packages.special.execute(conn.cursor(), "watch 0.01 select 1")
+    for _ in range(3):
+        title, rows, headers, status = next(results)
+        assert (title, list(rows), headers) == ("> select 1", [(1,)], ["1"])
+        assert not litecli.packages.special.is_pager_enabled()
+    results.close()
+    assert litecli.packages.special.is_pager_enabled()
+
+
+def test_tee_command(tmp_path):
+    tee_path = tmp_path / "tee.txt"
+    litecli.packages.special.execute(None, "tee " + str(tee_path))
+    litecli.packages.special.write_tee("\x1b[31mhello\x1b[0m world")
+    litecli.packages.special.flush_tee()
+    assert tee_path.read_text() == "hello world\n"
+    litecli.packages.special.close_tee()
+
+
+def test_favorite_queries_are_written_right_away(tmp_path):
+    config_file = tmp_path / "config"
+    favorites = FavoriteQueries(ConfigObj(str(config_file)))
+
+    favorites.save("one", "select 1")
+    favorites.save("two", "select 2")
+    assert favorites.delete("one") == "one: Deleted"
+    assert ConfigObj(str(config_file))["favorite_queries"] == {"two": "select 2"}
+
+    # A failed write is reported to the caller.
+    favorites = FavoriteQueries(ConfigObj(str(tmp_path / "missing" / "config")))
+    with pytest.raises(OSError):
+        favorites.save("one", "select 1")
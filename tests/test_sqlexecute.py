@@ -47,6 +47,19 @@ def test_binary(executor):
 #     assert set(executor.table_columns()) == set([("a", "x"), ("a", "y"), ("b", "z")])
 
 
+@dbtest
+def test_table_columns(executor):
+    run(executor, "create table a(a text, b text)")
+    run(executor, "create table x(x int)")
+    assert list(executor.table_columns()) == [("a", "a"), ("a", "b"), ("x", "x")]
+
+
+@dbtest
+def test_connection_pragmas(executor):
+    assert run(executor, "pragma cache_size")[0]["rows"] == [(-65536,)]
+    assert run(executor, "pragma temp_store")[0]["rows"] == [(0,)]
+
+
 @dbtest
 def test_database_list(executor):
     databases = executor.databases()
@@ -109,6 +122,14 @@ def test_multiple_queries_same_line(executor):
     assert expected == results
 
 
+@dbtest
+def test_single_query_with_trailing_semicolon(executor):
+    results = run(executor, "select 'foo;bar';")
+    assert results == [{"title": None, "headers": ["'foo;bar'"], "rows": [("foo;bar",)], "status": "1 row in set"}]
+
+    assert run(executor, "  ") == [{"title": None, "headers": None, "rows": None, "status": None}]
+
+
 @dbtest
 def test_multiple_queries_same_line_syntaxerror(executor):
     with pytest.raises(OperationalError) as excinfo: